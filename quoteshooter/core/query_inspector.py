@@ -0,0 +1,202 @@
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.logger import logger
+
+DEFAULT_REPEAT_THRESHOLD = 3
+# управление транзакциями не считается запросами к данным
+TRANSACTION_PREFIXES = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+class QueryBudgetExceeded(Exception):
+    """Превышен бюджет запросов или найден N+1 (в строгом режиме)."""
+
+class QueryRecorder:
+    """
+    Обёртка для connection.execute_wrapper: запоминает SQL всех запросов.
+
+    SQL приходит с плейсхолдерами (%s), а параметры — отдельно,
+    поэтому сам текст запроса и есть его "форма".
+    BEGIN/SAVEPOINT и т. п. не записываются.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.record(sql)
+        return execute(sql, params, many, context)
+
+    def record(self, sql):
+        if not sql.lstrip().upper().startswith(TRANSACTION_PREFIXES):
+            self.queries.append(sql)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=DEFAULT_REPEAT_THRESHOLD):
+        """
+        Формы запросов, выполненные не меньше threshold раз — кандидаты в N+1.
+
+        Returns:
+            list[tuple[str, int]]: (SQL, количество повторов).
+        """
+        return [(sql, n) for sql, n in Counter(self.queries).most_common() if n >= threshold]
+
+# Запросы пишутся в рекордер текущего HTTP-запроса через ContextVar:
+# контекст переносится asgiref в потоки sync_to_async, поэтому учитываются
+# и запросы синхронных вью под ASGI, и запросы при отдаче потокового тела.
+_current_recorder = ContextVar('query_recorder', default=None)
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.record(sql)
+    return execute(sql, params, many, context)
+
+def _install_wrapper(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+connection_created.connect(_install_wrapper)
+
+def query_budget(url_name, method):
+    """
+    Бюджет запросов из settings.QUERY_BUDGETS.
+
+    Значение бюджета — число (для любого метода) или словарь
+    по HTTP-методу, например {'GET': 2, 'POST': 20}.
+
+    Returns:
+        int | None: бюджет или None, если он не задан.
+    """
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(url_name)
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+def inspect_queries(recorder, url_name, method='GET'):
+    """
+    Проверяет записанные запросы на N+1 и бюджет URL.
+
+    Args:
+        recorder (QueryRecorder): запросы одного HTTP-запроса.
+        url_name (str | None): имя URL из urls.py.
+        method (str): HTTP-метод запроса.
+
+    Returns:
+        list[str]: описания найденных нарушений.
+    """
+    problems = []
+    threshold = getattr(settings, 'QUERY_INSPECTOR_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+    for sql, n in recorder.repeated(threshold):
+        problems.append(f'N+1: запрос выполнен {n} раз: {sql}')
+
+    budget = query_budget(url_name, method)
+    if budget is not None and len(recorder) > budget:
+        problems.append(f'бюджет {budget} превышен: {len(recorder)} запросов')
+    return problems
+
+class QueryInspectorMiddleware:
+    """
+    Считает SQL-запросы каждого HTTP-запроса.
+
+    Логирует повторяющиеся формы запросов (N+1) и превышение бюджета
+    из settings.QUERY_BUDGETS (по имени URL и HTTP-методу). При QUERY_INSPECTOR_STRICT=True
+    (тесты) вместо предупреждения бросает QueryBudgetExceeded.
+
+    Для StreamingHttpResponse проверка выполняется, когда поток тела
+    закрыт, — с учётом запросов, выполненных во время отдачи.
+    Работает и в синхронном, и в асинхронном стеке middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # соединения, открытые до загрузки middleware, сигнал connection_created уже пропустили
+        for connection in connections.all(initialized_only=True):
+            _install_wrapper(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self._process(request, response, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self._process(request, response, recorder)
+
+    def _process(self, request, response, recorder):
+        if not response.streaming:
+            self._check(request, recorder)
+            return response
+
+        content = response.streaming_content
+        if response.is_async:
+            response.streaming_content = self._arecord_stream(content, request, recorder)
+        else:
+            response.streaming_content = self._record_stream(content, request, recorder)
+        return response
+
+    def _record_stream(self, content, request, recorder):
+        iterator = iter(content)
+        try:
+            while True:
+                token = _current_recorder.set(recorder)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    _current_recorder.reset(token)
+                yield chunk
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            self._check(request, recorder)
+
+    async def _arecord_stream(self, content, request, recorder):
+        iterator = aiter(content)
+        try:
+            while True:
+                token = _current_recorder.set(recorder)
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current_recorder.reset(token)
+                yield chunk
+        finally:
+            if hasattr(iterator, 'aclose'):
+                await iterator.aclose()
+            self._check(request, recorder)
+
+    def _check(self, request, recorder):
+        match = request.resolver_match
+        url_name = match.url_name if match else None
+        problems = inspect_queries(recorder, url_name, request.method)
+        if problems:
+            message = f'{request.method} {request.path} ({url_name}): ' + '; '.join(problems)
+            if getattr(settings, 'QUERY_INSPECTOR_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
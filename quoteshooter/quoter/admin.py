@@ -1,19 +1,28 @@
 from django.contrib import admin
 from .models import Source, Quote
+from .utils.paginator import EstimatedCountPaginator
 
 
 @admin.register(Source)
 class SourceAdmin(admin.ModelAdmin):
     list_display = ("id", "data")
     search_fields = ("data",)
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Quote)
 class QuoteAdmin(admin.ModelAdmin):
     list_display = ("id", "text_short", "source", "weight", "views_cnt", "likes", "dislikes", "creation_time")
-    list_filter = ("source", "creation_time")
+    # фильтр по source рендерил бы строку на каждый источник — выбор источника через поиск/автодополнение
+    list_filter = ("creation_time",)
+    list_select_related = ("source",)
+    autocomplete_fields = ("source",)
     search_fields = ("text", "source__data")
-    ordering = ("-creation_time",)
+    ordering = ("-creation_time", "-id") # индекс quote_created_id_idx
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def text_short(self, obj):
         return (obj.text[:50] + "...") if len(obj.text) > 50 else obj.text
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class QuoterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quoter'
+
+    def ready(self):
+        from . import signals  # noqa: F401
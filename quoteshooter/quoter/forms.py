@@ -1,6 +1,7 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from .models import Quote, Source
+from .utils.near_duplicates import find_near_duplicates
 from core.logger import logger
 import random
 
@@ -47,6 +48,14 @@ class QuoteForm(forms.ModelForm):
             ).exists()
             if dup:
                 self.add_error('text', 'Такая цитата уже существует для этого источника.')
+            else:
+                # переформулированные копии (MinHash/LSH) ищутся, как и точные,
+                # только у того же источника: одна фраза бывает у разных авторов
+                near = find_near_duplicates(text, source=src_text)
+                if near:
+                    quote_id, score = near[0]
+                    logger.info(f'Найден почти-дубликат цитаты {quote_id} (сходство {score:.2f})')
+                    self.add_error('text', f'Очень похожая цитата уже существует для этого источника (сходство {score:.0%}).')
 
         src_qs = Source.objects.filter(data__iexact=src_text)
         if src_qs.exists():
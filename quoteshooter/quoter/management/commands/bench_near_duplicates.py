@@ -0,0 +1,95 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from quoter.models import Quote, QuoteBand, QuoteSignature, Source
+from quoter.utils import minhash
+from quoter.utils.near_duplicates import find_near_duplicates
+
+WORDS = (
+    'жизнь время человек мир дело день рука раз глаз слово место лицо друг '
+    'сердце правда память свобода смысл дорога надежда любовь страх мечта '
+    'город ночь солнце ветер море путь сила голос душа вопрос ответ'
+).split()
+
+class _Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк задержки find_near_duplicates на синтетическом индексе. '
+        'Все данные создаются в транзакции и откатываются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quotes', type=int, default=1_000_000, help='Размер индекса.')
+        parser.add_argument('--lookups', type=int, default=200, help='Количество поисков.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        try:
+            with transaction.atomic():
+                self._run(rng, options)
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write('Синтетические данные откатены.')
+
+    def _text(self, rng):
+        return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+
+    def _run(self, rng, options):
+        n, lookups, batch = options['quotes'], options['lookups'], options['batch_size']
+        source = Source.default()
+
+        # Сигнатуры "фоновых" цитат случайны: вычислять MinHash миллиона текстов
+        # для замера поиска не нужно, важен только размер индекса корзин.
+        # Последние `lookups` цитат — настоящие тексты, их ищем в изменённом виде.
+        started = time.perf_counter()
+        texts = []
+        created = 0
+        while created < n:
+            size = min(batch, n - created)
+            real = max(0, created + size - (n - lookups))
+            chunk = [self._text(rng) for _ in range(real)]
+            texts.extend(chunk)
+            quotes = Quote.objects.bulk_create(
+                Quote(text=f'bench {created + i}', source=source, weight=1.0) for i in range(size - real)
+            ) + Quote.objects.bulk_create(
+                Quote(text=text, source=source, weight=1.0) for text in chunk
+            )
+
+            signatures, bands = [], []
+            for quote in quotes:
+                if quote.text.startswith('bench '):
+                    sig = [rng.getrandbits(60) for _ in range(minhash.NUM_PERM)]
+                else:
+                    sig = minhash.signature(quote.text)
+                signatures.append(QuoteSignature(quote_id=quote.id, data=minhash.pack(sig)))
+                bands.extend(QuoteBand(quote_id=quote.id, bucket=b) for b in minhash.buckets(sig))
+            QuoteSignature.objects.bulk_create(signatures)
+            QuoteBand.objects.bulk_create(bands)
+            created += size
+        self.stdout.write(f'Индекс: {n} цитат за {time.perf_counter() - started:.1f} с')
+
+        timings, hits = [], 0
+        for text in texts:
+            # переставляем знаки и регистр, меняем одно слово
+            words = text.split()
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+            query = ', '.join(words).capitalize() + '!'
+            t0 = time.perf_counter()
+            hits += bool(find_near_duplicates(query, threshold=0.5))
+            timings.append((time.perf_counter() - t0) * 1000)
+
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисков: {len(timings)}, найдено: {hits}; '
+            f'p50 {statistics.median(timings):.2f} мс, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} мс, '
+            f'max {timings[-1]:.2f} мс'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quoter.utils.near_duplicates import BATCH_SIZE, rebuild_index
+
+class Command(BaseCommand):
+    help = 'Строит MinHash/LSH-индекс почти-дубликатов для всех цитат за один проход.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Количество цитат в одной пачке bulk_create.')
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано цитат: {total}'))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from quoter.utils.sampler import is_stale, publish_snapshot, snapshot_path
+
+class Command(BaseCommand):
+    help = 'Строит снимок весов цитат для Quote.weighted_random и публикует новое поколение.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true',
+                            help='Работать единственным сборщиком: перестраивать снимок после изменений весов.')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Период проверки отметки изменений в режиме --watch, сек.')
+
+    def handle(self, *args, **options):
+        started = time.time_ns()
+        generation = publish_snapshot()
+        if generation is None:
+            self.stdout.write(self.style.WARNING('QUOTER_SAMPLER_PATH не задан, снимок отключён.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Опубликовано поколение {generation}: {snapshot_path()}'))
+
+        # изменения за интервал схлопываются в одну пересборку
+        while options['watch']:
+            time.sleep(options['interval'])
+            if not is_stale(started):
+                continue
+            close_old_connections()
+            started = time.time_ns()
+            generation = publish_snapshot()
+            self.stdout.write(f'Опубликовано поколение {generation}')
@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 from core.logger import logger
+from .utils.live_counters import broker
 
 class Source(models.Model):
     """Модель источника цитаты."""
@@ -22,6 +23,15 @@ class Source(models.Model):
         if create_flag:
             logger.info(f'Создан новый источник по умолчанию: {obj}')
         return obj
+
+    @classmethod
+    def default_pk(cls):
+        """
+        Возвращает pk источника по умолчанию.
+        Используется как default для Quote.source: значением по умолчанию
+        для ForeignKey должен быть pk, а не объект модели.
+        """
+        return cls.default().pk
     
 class Quote(models.Model):
     """Модель цитаты.
@@ -39,7 +49,7 @@ class Quote(models.Model):
     source = models.ForeignKey(Source,
         on_delete=models.PROTECT,
         related_name='quotes',
-        default=Source.default
+        default=Source.default_pk
     )
     weight = models.FloatField(
         default=0.0,
@@ -74,6 +84,22 @@ class Quote(models.Model):
                 name='weight_1_and_100_bounds'
             )
         ]
+        indexes = [
+            # keyset-пагинация топов: ORDER BY <поле> DESC, id DESC
+            models.Index(
+                fields=['-views_cnt', '-id'],
+                name='quote_views_id_idx'
+            ),
+            models.Index(
+                fields=['-likes', '-id'],
+                name='quote_likes_id_idx'
+            ),
+            # сортировка списка цитат в админке
+            models.Index(
+                fields=['-creation_time', '-id'],
+                name='quote_created_id_idx'
+            ),
+        ]
 
     def clean(self):
         """
@@ -142,6 +168,16 @@ class Quote(models.Model):
         
         EMPTY_QUOTES_LIST_WEIGHT = -1.0
         import random
+        from .utils.sampler import sample_quote_id
+
+        # Быстрый путь: бинарный поиск по общему снимку весов (см. utils/sampler.py).
+        # Если снимка нет или выбранная цитата уже удалена — обычный проход по БД.
+        __snap_id = sample_quote_id()
+        if __snap_id is not None:
+            _q = cls.objects.select_related('source').filter(pk=__snap_id).first()
+            if _q is not None:
+                logger.info(f'Выбрана случайная цитата по снимку: {_q.id}')
+                return _q
 
         __quotes = cls.objects.all()
 
@@ -178,6 +214,7 @@ class Quote(models.Model):
         Увеличивает счетчик просмотров на 1 атомарно.
         """
         self.__atomar(views_cnt=F('views_cnt') + 1)
+        broker.publish(self.id, self.views_cnt + 1, self.likes, self.dislikes)
         logger.info(f'Увеличен счетчик просмотров цитаты {self.id}: {self.views_cnt + 1}')
 
     def save(self, *args, **kwargs):
@@ -224,4 +261,31 @@ class Quote(models.Model):
         obj, create_flag = Source.objects.get_or_create(data=src_text)
         if create_flag:
             logger.info(f'Создан источник: {obj}')
-        return obj
\ No newline at end of file
+        return obj
+
+class QuoteSignature(models.Model):
+    """MinHash-сигнатура текста цитаты для поиска почти-дубликатов.
+
+    Args:
+        quote (OneToOneField[Quote]): Цитата.
+        data (bytes): Упакованная сигнатура (см. utils/minhash.py).
+    """
+    quote = models.OneToOneField(Quote,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature'
+    )
+    data = models.BinaryField()
+
+class QuoteBand(models.Model):
+    """LSH-корзина одной полосы MinHash-сигнатуры цитаты.
+
+    Args:
+        quote (ForeignKey[Quote]): Цитата.
+        bucket (int): Хеш полосы вместе с её номером.
+    """
+    quote = models.ForeignKey(Quote,
+        on_delete=models.CASCADE,
+        related_name='bands'
+    )
+    bucket = models.BigIntegerField(db_index=True)
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Quote, Source
+from .utils.sampler import mark_stale
+from .utils.payload_cache import payload_cache
+from .utils.near_duplicates import index_quote
+
+# Поля, попадающие в снимок весов и в предкодированный ответ API
+STATIC_FIELDS = {'text', 'source', 'weight'}
+
+@receiver(post_save, sender=Quote)
+def mark_sampler_stale_on_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Отмечает снимок весов устаревшим после сохранения цитаты
+    и сбрасывает её закэшированный ответ API.
+    Новое поколение публикует сборщик (build_sampler --watch).
+    Сохранения только счётчиков (например, голоса) пропускаются.
+    """
+    if update_fields is not None and not STATIC_FIELDS & set(update_fields):
+        return
+    payload_cache.invalidate(instance.pk)
+    transaction.on_commit(mark_stale)
+
+@receiver(post_delete, sender=Quote)
+def mark_sampler_stale_on_delete(sender, instance, **kwargs):
+    """
+    Отмечает снимок весов устаревшим после удаления цитаты.
+    """
+    payload_cache.invalidate(instance.pk)
+    transaction.on_commit(mark_stale)
+
+@receiver(post_save, sender=Source)
+def mark_sampler_stale_on_source_save(sender, instance, created=False, **kwargs):
+    """
+    Изменение источника меняет ответы API всех его цитат:
+    сбрасывает кэш и отмечает снимок устаревшим — новое поколение от сборщика
+    сбросит кэши других воркеров.
+    """
+    if created:
+        return
+    payload_cache.clear()
+    transaction.on_commit(mark_stale)
+
+@receiver(post_save, sender=Quote)
+def reindex_near_duplicates_on_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Пересчитывает MinHash-сигнатуру и LSH-корзины при изменении текста цитаты.
+    """
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    index_quote(instance)
@@ -60,6 +60,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             await updateQuoteCard(payload.quote);
+            if (typeof setupLiveCounters === 'function') setupLiveCounters();
 
         } catch (err) {
             console.error('Ошибка при получении случайной цитаты:', err);
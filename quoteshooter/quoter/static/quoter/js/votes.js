@@ -56,6 +56,50 @@ function setupVoteHandlers() {
     });
 }
 
+let liveSource = null;
+
+/**
+ * Подписывается на SSE-поток живых счетчиков для цитат на странице.
+ *
+ * Логика:
+ * 1. Собирает id цитат из форм голосования.
+ * 2. Закрывает предыдущее соединение и открывает EventSource на /api/quote/live/.
+ * 3. В каждом событии приходит массив {id, views_cnt, likes, dislikes} —
+ *    обновляет изменившиеся счетчики с анимацией.
+ *
+ * Вызывается повторно при смене цитаты (next_quote.js).
+ * Работает, только если сервер включил поток (data-live-counters="1" у body).
+ */
+function setupLiveCounters() {
+    if (!window.EventSource || document.body.dataset.liveCounters !== "1") return;
+
+    const ids = [...new Set(
+        [...document.querySelectorAll(".like-form[data-id]")].map(form => form.dataset.id)
+    )];
+
+    if (liveSource) liveSource.close();
+    liveSource = null;
+    if (!ids.length) return;
+
+    liveSource = new EventSource(`/api/quote/live/?ids=${ids.join(",")}`);
+    liveSource.onmessage = e => {
+        JSON.parse(e.data).forEach(update => {
+            const likeForm = document.querySelector(`.like-form[data-id='${update.id}']`);
+            if (!likeForm) return;
+
+            ["like", "dislike"].forEach(type => {
+                const counter = document.querySelector(`.${type}-form[data-id='${update.id}'] .${type}-count`);
+                const value = update[type + "s"];
+                if (counter && counter.textContent !== String(value)) animateCounter(counter, value);
+            });
+
+            const views = likeForm.closest(".quote-card")?.querySelector(".quote-stats .stat");
+            if (views) views.textContent = "👁 " + update.views_cnt;
+        });
+    };
+}
+
 document.addEventListener("DOMContentLoaded", () => {
     setupVoteHandlers();
+    setupLiveCounters();
 });
@@ -1,3 +1,492 @@
-from django.test import TestCase
+import json
+import os
+import random
+import tempfile
+import time
+from array import array
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.query_inspector import QueryBudgetExceeded, QueryRecorder
+from .forms import QuoteForm
+from .models import Quote, QuoteBand, QuoteSignature, Source
+from .utils.near_duplicates import find_near_duplicates, rebuild_index
+from .utils import sampler
+from .utils.live_counters import MAX_IDS, CounterBroker, parse_ids
+from .utils.payload_cache import PayloadCache, PayloadRecord, payload_cache
+from .utils.sampler import publish_snapshot
+from .utils.top_quotes import TOP_PAGE_SIZE_MAX, clamp_page_size, parse_cursor
+
+QUOTES_CNT = 30
+TOP_QUOTES_CNT = 25
+ADMIN_CHANGELIST_QUERIES = 5
+
+
+class SamplerSnapshotMixin:
+    """Снимок весов во временном каталоге теста."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'sampler.snapshot')
+        override = override_settings(QUOTER_SAMPLER_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+
+class SamplerTests(SamplerSnapshotMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        source = Source.objects.create(data='Автор')
+        self.light, self.heavy, self.zero = Quote.objects.bulk_create([
+            Quote(text='Лёгкая', source=source, weight=1.0),
+            Quote(text='Тяжёлая', source=source, weight=3.0),
+            Quote(text='Нулевая', source=source, weight=0.0),
+        ])
+
+    def test_snapshot_format(self):
+        self.assertEqual(publish_snapshot(), 1)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        magic, generation, count, total = sampler.HEADER.unpack_from(data)
+        self.assertEqual((magic, generation, count, total), (sampler.MAGIC, 1, 2, 4.0))
+        body = array('q', data[sampler.HEADER.size:sampler.HEADER.size + 16])
+        cumul = array('d', data[sampler.HEADER.size + 16:])
+        self.assertEqual(list(body), [self.light.id, self.heavy.id])
+        self.assertEqual(list(cumul), [1.0, 4.0])
+
+    def test_remap_on_new_generation(self):
+        publish_snapshot()
+        first = sampler.current_snapshot()
+        self.assertIs(sampler.current_snapshot(), first)
+
+        Quote.objects.filter(pk=self.zero.pk).update(weight=5.0)
+        self.assertEqual(publish_snapshot(), 2)
+        second = sampler.current_snapshot()
+        self.assertIsNot(second, first)
+        self.assertEqual((second.generation, second.count, second.total), (2, 3, 9.0))
+        # старое отображение остаётся читаемым
+        self.assertEqual(first.ids[1], self.heavy.id)
+
+    def test_sample_distribution(self):
+        publish_snapshot()
+        random.seed(0)
+        snap = sampler.current_snapshot()
+        picks = [snap.sample() for _ in range(4000)]
+        self.assertNotIn(self.zero.id, picks)
+        self.assertAlmostEqual(picks.count(self.heavy.id) / len(picks), 0.75, delta=0.03)
+
+    def test_edge_cases(self):
+        self.assertIsNone(sampler.current_snapshot())
+
+        Quote.objects.update(weight=0.0)
+        publish_snapshot()
+        self.assertIsNone(sampler.current_snapshot().sample())
+
+        with open(self.path, 'wb') as f:
+            f.write(b'garbage' * 10)
+        self.assertIsNone(sampler.current_snapshot())
+
+    def test_stale_marker(self):
+        publish_snapshot()
+        self.assertFalse(sampler.is_stale(0))
+        with self.captureOnCommitCallbacks(execute=True):
+            Quote.objects.get(pk=self.light.pk).save(update_fields=['weight'])
+        self.assertTrue(sampler.is_stale(0))
+        self.assertIsNotNone(sampler.current_snapshot())
+
+        # сборщик давно не публиковал снимок — воркеры выбирают по БД
+        future = time.time() + 3600
+        os.utime(self.path + sampler.STALE_SUFFIX, (future, future))
+        self.assertIsNone(sampler.current_snapshot())
+
+class PayloadCacheTests(SamplerSnapshotMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        payload_cache.clear()
+        self.source = Source.objects.create(data='Автор "Книга" \\ ё')
+        self.quote = Quote(text='Текст с "кавычками"\nи переносом', source=self.source, weight=42.5)
+        self.quote.save()
+        Quote.objects.filter(pk=self.quote.pk).update(views_cnt=7, likes=3, dislikes=1)
+
+    def record(self, quote_id):
+        return PayloadRecord(quote_id, 'text', 'source', 1.0)
+
+    def test_lru_eviction(self):
+        cache = PayloadCache(2)
+        cache.get(1) # фиксирует поколение None
+        cache.put(1, self.record(1))
+        cache.put(2, self.record(2))
+        self.assertIsNotNone(cache.get(1))
+        cache.put(3, self.record(3))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(2))
+        self.assertIsNotNone(cache.get(1))
+        self.assertIsNotNone(cache.get(3))
+
+    def test_generation_change_clears(self):
+        cache = PayloadCache(10)
+        cache.get(1, generation=1)
+        cache.put(1, self.record(1))
+        self.assertIsNotNone(cache.get(1, generation=1))
+        self.assertIsNone(cache.get(1, generation=2))
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidation_on_edits(self):
+        payload_cache.put(self.quote.pk, self.record(self.quote.pk))
+        payload_cache.put(-1, self.record(-1))
+
+        self.quote.likes += 1
+        self.quote.save(update_fields=['likes', 'dislikes'])
+        self.assertIn(self.quote.pk, payload_cache._records)
+
+        self.quote.text = 'Новый текст'
+        self.quote.save(update_fields=['text'])
+        self.assertNotIn(self.quote.pk, payload_cache._records)
+        self.assertIn(-1, payload_cache._records)
+
+        self.source.data = 'Другой автор'
+        self.source.save()
+        self.assertEqual(len(payload_cache), 0)
+
+    def test_matches_json_response(self):
+        # без снимка ответ собирает прежний путь через Quote и JsonResponse
+        with override_settings(QUOTER_SAMPLER_PATH=None):
+            expected = self.client.get(reverse('api_random_quote')).json()
+        self.assertEqual(expected['quote']['views_cnt'], 7)
+
+        publish_snapshot()
+        for views_cnt in (8, 9): # промах и попадание в кэш
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('api_random_quote'))
+            self.assertEqual(response['Content-Type'], 'application/json')
+            expected['quote']['views_cnt'] = views_cnt
+            self.assertEqual(response.json(), expected)
+        self.assertIn(self.quote.pk, payload_cache._records)
+
+class TopPaginationTests(TestCase):
+    """Keyset-пагинация топов: обход всех страниц при равных счётчиках."""
+
+    @classmethod
+    def setUpTestData(cls):
+        source = Source.objects.create(data='Автор')
+        Quote.objects.bulk_create(
+            Quote(text=f'Цитата {i}', source=source, weight=1.0, views_cnt=i % 3, likes=i % 4)
+            for i in range(TOP_QUOTES_CNT)
+        )
+
+    def expected(self, field):
+        return list(Quote.objects.order_by(f'-{field}', '-id').values_list('id', flat=True))
+
+    def test_html_walk(self):
+        for name, field in (('top', 'views_cnt'), ('top_likes', 'likes')):
+            with self.subTest(name=name):
+                seen, cursor = [], ''
+                for _ in range(TOP_QUOTES_CNT):
+                    response = self.client.get(reverse(name, args=(7,)), {'cursor': cursor} if cursor else {})
+                    seen += [q.id for q in response.context['quotes']]
+                    cursor = response.context['next_cursor']
+                    if not cursor:
+                        break
+                self.assertEqual(seen, self.expected(field))
+
+    def test_api_walk(self):
+        for name, field in (('api_top', 'views_cnt'), ('api_top_likes', 'likes')):
+            with self.subTest(name=name):
+                seen, params = [], {'limit': 4}
+                for _ in range(TOP_QUOTES_CNT):
+                    response = self.client.get(reverse(name), params)
+                    page = json.loads(b''.join(response.streaming_content))
+                    seen += [q['id'] for q in page['quotes']]
+                    if not page['next_cursor']:
+                        break
+                    params['cursor'] = page['next_cursor']
+                self.assertEqual(seen, self.expected(field))
+
+    def test_invalid_params(self):
+        for params in ({'limit': 'abc'}, {'cursor': '5_3_2'}, {'cursor': '-1_2'}, {'cursor': '12'}, {'cursor': '1_x'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('api_top'), params).status_code, 400)
+        response = self.client.get(reverse('top', args=(10,)), {'cursor': '5_3_2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['quotes']), 10)
+
+    def test_page_size_capped(self):
+        self.assertEqual(clamp_page_size(10 ** 6), TOP_PAGE_SIZE_MAX)
+        self.assertEqual(clamp_page_size(0), 1)
+        self.assertEqual(parse_cursor('5_32'), (5, 32))
+        self.assertIsNone(parse_cursor(''))
+
+class QuoteDataMixin(SamplerSnapshotMixin):
+    """Цитаты с разными источниками, чтобы N+1 по source был заметен."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(QUOTES_CNT):
+            Quote(text=f'Цитата {i}', source=Source.objects.create(data=f'Автор {i}'), weight=50.0).save()
+        cls.quote = Quote.objects.order_by('id').first()
+
+    def setUp(self):
+        super().setUp()
+        publish_snapshot()
+
+class QueryInspectorTests(QuoteDataMixin, TestCase):
+
+    def test_recorder_detects_n_plus_one(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            [q.source.data for q in Quote.objects.all()]
+        self.assertEqual(len(recorder), QUOTES_CNT + 1)
+        self.assertEqual(recorder.repeated()[0][1], QUOTES_CNT)
+
+    def test_recorder_select_related(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            [q.source.data for q in Quote.objects.select_related('source')]
+        self.assertEqual(len(recorder), 1)
+        self.assertEqual(recorder.repeated(), [])
+
+    @override_settings(QUERY_INSPECTOR_STRICT=True, QUERY_BUDGETS={'top': 0})
+    def test_strict_mode_raises_over_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('top', args=(10,)))
+
+    @override_settings(QUERY_INSPECTOR_STRICT=True, QUERY_BUDGETS={'api_top': 0})
+    def test_streaming_queries_counted(self):
+        response = self.client.get(reverse('api_top'))
+        with self.assertRaises(QueryBudgetExceeded):
+            b''.join(response.streaming_content)
+
+    @override_settings(QUERY_INSPECTOR_STRICT=True, QUERY_BUDGETS={'top': 0})
+    async def test_async_stack_over_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            await self.async_client.get(reverse('top', args=(10,)))
+
+    @override_settings(QUERY_INSPECTOR_STRICT=True)
+    async def test_async_stack_within_budget(self):
+        response = await self.async_client.get(reverse('top', args=(10,)))
+        self.assertEqual(response.status_code, 200)
+
+@override_settings(QUERY_INSPECTOR_STRICT=True)
+class QueryBudgetTests(QuoteDataMixin, TestCase):
+    """Все страницы укладываются в settings.QUERY_BUDGETS (строгий режим бросает исключение)."""
+
+    def test_get_pages(self):
+        urls = [
+            reverse('home'),
+            reverse('top', args=(10,)),
+            reverse('top_likes', args=(10,)),
+            reverse('api_random_quote'),
+            reverse('api_top'),
+            reverse('api_top_likes'),
+            reverse('add'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                if response.streaming:
+                    # бюджет потоковых ответов проверяется при закрытии потока
+                    b''.join(response.streaming_content)
+
+    def test_votes_and_weight(self):
+        for name in ('like_quote', 'like_quote', 'dislike_quote'):
+            with self.subTest(name=name):
+                self.assertEqual(self.client.post(reverse(name, args=(self.quote.id,))).status_code, 200)
+        response = self.client.post(
+            reverse('update_weight', args=(self.quote.id,)),
+            {'weight': 10}, content_type='application/json'
+        )
+        self.assertTrue(response.json()['success'])
+
+    def test_add_submission(self):
+        submissions = (
+            {'author': 'Новый автор', 'name': 'Книга', 'text': 'Совсем новая мысль о времени', 'weight': 5},
+            {'author': 'Автор 1', 'text': 'Ещё одна мысль о чём-то другом'},
+        )
+        for data in submissions:
+            with self.subTest(author=data['author']):
+                response = self.client.post(reverse('add'), data)
+                self.assertEqual(response.status_code, 302)
+                self.assertTrue(Quote.objects.filter(text=data['text']).exists())
+
+        # невалидная форма отрисовывается заново
+        response = self.client.post(reverse('add'), {'author': 'Автор 1', 'text': 'Цитата 1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+
+    @override_settings(QUERY_BUDGETS={'add': {'GET': 2, 'POST': 0}})
+    def test_budget_per_method(self):
+        self.assertEqual(self.client.get(reverse('add')).status_code, 200)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.post(reverse('add'), {'author': 'Кто-то', 'text': 'Новая мысль'})
+
+    def test_top_query_count_does_not_grow_with_page(self):
+        for size in (5, QUOTES_CNT):
+            with self.subTest(size=size), self.assertNumQueries(1):
+                self.client.get(reverse('top', args=(size,)))
+
+class NearDuplicateTests(TestCase):
+
+    TEXT = 'Не важно, как медленно ты идёшь, главное — не останавливаться.'
+
+    def setUp(self):
+        self.quote = Quote(text=self.TEXT, source=Source.objects.create(data='Конфуций'))
+        self.quote.save()
+
+    def test_quote_indexed_on_save(self):
+        self.assertTrue(QuoteSignature.objects.filter(quote=self.quote).exists())
+        self.assertEqual(QuoteBand.objects.filter(quote=self.quote).count(), 16)
+
+    def test_reworded_copy_found(self):
+        found = find_near_duplicates('не важно как медленно ты идешь — главное, НЕ ОСТАНАВЛИВАТЬСЯ!!!')
+        self.assertEqual(found[0][0], self.quote.id)
+        self.assertEqual(find_near_duplicates('Совсем другая мысль о жизни и времени.'), [])
+
+    def test_form_rejects_near_duplicate_of_same_source(self):
+        form = QuoteForm(data={'author': 'Конфуций', 'text': 'Неважно, как медленно ты идешь; главное - не останавливаться'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('text', form.errors)
+
+    def test_form_accepts_same_text_from_other_source(self):
+        form = QuoteForm(data={'author': 'Кто-то', 'text': self.TEXT})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(find_near_duplicates(self.TEXT, source='Кто-то'), [])
+        self.assertEqual(find_near_duplicates(self.TEXT, source='Конфуций')[0][0], self.quote.id)
+
+    def test_punctuation_only_text_not_compared(self):
+        first = Quote(text='!!!', source=self.quote.source)
+        first.save()
+        self.assertFalse(QuoteSignature.objects.filter(quote=first).exists())
+        self.assertFalse(QuoteBand.objects.filter(quote=first).exists())
+        self.assertEqual(find_near_duplicates('...?', source='Конфуций'), [])
+        self.assertTrue(QuoteForm(data={'author': 'Конфуций', 'text': '— …'}).is_valid())
+        self.assertEqual(rebuild_index(), 1)
+
+    def test_rebuild_index(self):
+        QuoteBand.objects.all().delete()
+        QuoteSignature.objects.all().delete()
+        self.assertEqual(rebuild_index(), 1)
+        self.assertEqual(find_near_duplicates(self.TEXT)[0], (self.quote.id, 1.0))
+
+class AdminChangelistTests(TestCase):
+    """Количество запросов и размер страницы списка в админке не растут с размером таблиц."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+
+    def _grow_to(self, n):
+        start = Source.objects.count()
+        sources = Source.objects.bulk_create(Source(data=f'Источник {i}') for i in range(start, n))
+        Quote.objects.bulk_create(Quote(text=f'Цитата {s.data}', source=s, weight=1.0) for s in sources)
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries], len(response.content)
+
+    def _assert_constant(self, url):
+        # каждая таблица растёт в своём тесте: данные другой модели не искажают замер
+        self._grow_to(200)
+        cache.clear()
+        small_queries, small_size = self._get(url)
+        self._grow_to(5000)
+        cache.clear()
+        large_queries, large_size = self._get(url)
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertLessEqual(len(large_queries), ADMIN_CHANGELIST_QUERIES)
+        # страница не должна содержать строку на каждый источник (list_filter по source)
+        self.assertLess(large_size, small_size * 1.1)
+
+        # повторный запрос берёт количество строк из кэша, без COUNT(*)
+        cached_queries, _ = self._get(url)
+        self.assertTrue(any('COUNT(' in sql for sql in large_queries))
+        self.assertFalse([sql for sql in cached_queries if 'COUNT(' in sql])
+        self.assertEqual(len(cached_queries), len(large_queries) - 1)
+
+    def test_quote_changelist_constant(self):
+        self._assert_constant(reverse('admin:quoter_quote_changelist'))
+
+    def test_source_changelist_constant(self):
+        self._assert_constant(reverse('admin:quoter_source_changelist'))
+
+class LiveCountersTests(TestCase):
+
+    async def subscribe(self, broker, ids):
+        sub = broker.subscribe(ids)
+        self.addCleanup(broker._task.cancel)
+        return sub
+
+    async def test_updates_coalesce_per_tick(self):
+        broker = CounterBroker()
+        first = await self.subscribe(broker, [1, 2])
+        second = await self.subscribe(broker, [1])
+
+        broker.publish(1, 10, 1, 0)
+        broker.publish(1, 11, 2, 0)
+        broker.publish(2, 5, 0, 1)
+        broker.publish(3, 7, 0, 0) # никто не подписан
+        broker.flush()
+
+        self.assertTrue(first.event.is_set())
+        self.assertEqual(json.loads(first.drain()[len('data: '):]), [
+            {'id': 1, 'views_cnt': 11, 'likes': 2, 'dislikes': 0},
+            {'id': 2, 'views_cnt': 5, 'likes': 0, 'dislikes': 1},
+        ])
+        self.assertFalse(first.event.is_set())
+        self.assertEqual(list(second.pending), [1])
+
+        # строка цитаты кодируется один раз на тик для всех подписчиков
+        broker.publish(1, 12, 2, 0)
+        broker.flush()
+        self.assertIs(first.pending[1], second.pending[1])
+
+        broker.flush()
+        self.assertEqual(len(first.pending), 1)
+
+    async def test_unsubscribe_cleans_watchers(self):
+        broker = CounterBroker()
+        first = await self.subscribe(broker, [1, 2])
+        second = await self.subscribe(broker, [2])
+        broker.unsubscribe(first)
+        self.assertEqual(broker._watchers, {2: {second}})
+        broker.unsubscribe(second)
+        self.assertEqual(broker._watchers, {})
+
+        broker.publish(2, 1, 1, 1)
+        self.assertEqual(broker._updates, {})
+
+    def test_parse_ids(self):
+        self.assertEqual(parse_ids('3,1,3, 2,'), [3, 1, 2])
+        self.assertEqual(len(parse_ids(','.join(str(i) for i in range(MAX_IDS * 2)))), MAX_IDS)
+        for raw in ('', ',', 'x', '1,y'):
+            with self.subTest(raw=raw), self.assertRaises(ValueError):
+                parse_ids(raw)
+
+    @override_settings(QUOTER_SSE_ENABLED=True)
+    def test_wsgi_gets_no_content(self):
+        response = self.client.get(reverse('live_counters'), {'ids': '1'})
+        self.assertEqual(response.status_code, 204)
+        self.assertContains(self.client.get(reverse('top', args=(10,))), 'data-live-counters="1"')
+
+    async def test_disabled_by_default(self):
+        response = await self.async_client.get(reverse('live_counters'), {'ids': '1'})
+        self.assertEqual(response.status_code, 204)
+
+    @override_settings(QUOTER_SSE_ENABLED=True)
+    async def test_asgi_stream(self):
+        response = await self.async_client.get(reverse('live_counters'), {'ids': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        await stream.aclose()
@@ -11,6 +11,9 @@ urlpatterns = [
     path('like/<int:quote_id>', views.like, name='like_quote'),
     path('dislike/<int:quote_id>', views.dislike, name='dislike_quote'),
     path('api/quote/random/', views.api_random_quote, name='api_random_quote'),
+    path('api/quote/top/', views.api_top_quotes, {'by': 'views'}, name='api_top'),
+    path('api/quote/top/likes/', views.api_top_quotes, {'by': 'likes'}, name='api_top_likes'),
+    path('api/quote/live/', views.live_counters, name='live_counters'),
     path("quotes/<int:quote_id>/update_weight/", views.update_weight, name="update_weight"),
 ]
 
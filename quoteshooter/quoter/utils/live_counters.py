@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+
+from core.logger import logger
+
+DEFAULT_TICK = 0.5 # период рассылки, сек
+HEARTBEAT = 15.0 # комментарий-пинг, чтобы прокси не рвали соединение
+MAX_IDS = 100 # максимум цитат на одну подписку
+
+class Subscription:
+    """
+    Подписка одного SSE-клиента на набор цитат.
+
+    Обновления копятся в pending (последнее значение на цитату),
+    event сигнализирует генератору ответа, что есть что отдать.
+    """
+    __slots__ = ('ids', 'pending', 'event')
+
+    def __init__(self, ids):
+        self.ids = frozenset(ids)
+        self.pending = {}
+        self.event = asyncio.Event()
+
+    def drain(self):
+        """
+        Забирает накопленные обновления.
+
+        Returns:
+            str: SSE-событие с JSON-массивом обновлённых цитат.
+        """
+        parts, self.pending = self.pending, {}
+        self.event.clear()
+        return 'data: [' + ','.join(parts.values()) + ']\n\n'
+
+class CounterBroker:
+    """
+    Внутрипроцессный pub/sub счётчиков цитат.
+
+    Издатели (обычные синхронные вью) вызывают publish() из любых потоков;
+    обновления одной цитаты за тик схлопываются в одно. Раз в тик задача
+    в event loop кодирует каждую цитату один раз и раздаёт готовую строку
+    всем подписчикам на неё, поэтому один тик обслуживает все соединения.
+
+    Подписчики живут только в этом процессе: при нескольких воркерах
+    клиент получает обновления, сделанные в его воркере.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._updates = {}
+        self._watchers = {} # quote_id -> set[Subscription]
+        self._task = None
+
+    def publish(self, quote_id, views_cnt, likes, dislikes):
+        if not self._watchers:
+            return
+        with self._lock:
+            self._updates[quote_id] = (views_cnt, likes, dislikes)
+
+    def subscribe(self, ids):
+        sub = Subscription(ids)
+        with self._lock:
+            for quote_id in sub.ids:
+                self._watchers.setdefault(quote_id, set()).add(sub)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for quote_id in sub.ids:
+                watchers = self._watchers.get(quote_id)
+                if watchers is not None:
+                    watchers.discard(sub)
+                    if not watchers:
+                        del self._watchers[quote_id]
+
+    def flush(self):
+        """
+        Раздаёт накопленные обновления подписчикам.
+        """
+        with self._lock:
+            updates, self._updates = self._updates, {}
+            targets = [(quote_id, counters, tuple(self._watchers.get(quote_id, ())))
+                       for quote_id, counters in updates.items()]
+
+        for quote_id, (views_cnt, likes, dislikes), subs in targets:
+            if not subs:
+                continue
+            encoded = json.dumps({
+                'id': quote_id,
+                'views_cnt': views_cnt,
+                'likes': likes,
+                'dislikes': dislikes,
+            })
+            for sub in subs:
+                sub.pending[quote_id] = encoded
+                sub.event.set()
+
+    async def _run(self):
+        tick = getattr(settings, 'QUOTER_SSE_TICK', DEFAULT_TICK)
+        logger.info('Запущена рассылка живых счётчиков')
+        while self._watchers:
+            await asyncio.sleep(tick)
+            self.flush()
+        logger.info('Рассылка живых счётчиков остановлена: нет подписчиков')
+
+broker = CounterBroker()
+
+def parse_ids(raw):
+    """
+    Разбирает GET-параметр ids вида '1,2,3'.
+
+    Returns:
+        list[int]: не больше MAX_IDS уникальных id.
+
+    Raises:
+        ValueError: если параметр пуст или некорректен.
+    """
+    ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    if not ids:
+        raise ValueError('Не указаны id цитат')
+    return ids[:MAX_IDS]
+
+async def stream_counters(ids):
+    """
+    Асинхронный генератор тела SSE-ответа.
+
+    Yields:
+        str: SSE-события с обновлениями или пинги раз в HEARTBEAT секунд.
+    """
+    sub = broker.subscribe(ids)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                await asyncio.wait_for(sub.event.wait(), timeout=HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield sub.drain()
+    finally:
+        broker.unsubscribe(sub)
@@ -0,0 +1,86 @@
+import hashlib
+import random
+import re
+import struct
+
+# 64 хеш-функции, 16 полос по 4 строки: пара цитат попадает в общую корзину
+# с вероятностью 1 - (1 - s^4)^16, т. е. ~50% при сходстве 0.5 и ~99.6% при 0.8
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4 # символьные n-граммы устойчивы к пунктуации и перестановке слов
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240917) # фиксированный seed: сигнатуры хранятся в БД
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f'<{NUM_PERM}q')
+_BAND = struct.Struct(f'<H{ROWS}q')
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+def normalize(text):
+    """
+    Приводит текст к виду для сравнения: нижний регистр, ё -> е,
+    пунктуация и повторяющиеся пробелы схлопываются в один пробел.
+    """
+    return _NON_WORD.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'little') % _PRIME
+
+def shingles(text):
+    """
+    Множество хешей символьных n-грамм нормализованного текста.
+    Пустое, если после нормализации текст пуст (одна пунктуация).
+    """
+    norm = normalize(text)
+    if not norm:
+        return set()
+    if len(norm) <= SHINGLE_SIZE:
+        return {_hash(norm)}
+    return {_hash(norm[i:i + SHINGLE_SIZE]) for i in range(len(norm) - SHINGLE_SIZE + 1)}
+
+def signature(text):
+    """
+    MinHash-сигнатура текста.
+
+    Returns:
+        list[int] | None: NUM_PERM минимумов хешей по случайным перестановкам
+        или None, если в тексте нет n-грамм для сравнения.
+    """
+    xs = shingles(text)
+    if not xs:
+        return None
+    return [min((a * x + b) % _PRIME for x in xs) for a, b in _PERMS]
+
+def pack(sig):
+    """Сигнатура -> bytes для хранения в БД."""
+    return _SIGNATURE.pack(*sig)
+
+def unpack(data):
+    """bytes из БД -> сигнатура."""
+    return _SIGNATURE.unpack(bytes(data))
+
+def buckets(sig):
+    """
+    LSH-корзины сигнатуры: по одной на полосу.
+
+    Номер полосы входит в хеш, поэтому корзины разных полос не пересекаются
+    и их можно хранить в одном столбце.
+
+    Returns:
+        list[int]: BANDS знаковых 64-битных номеров корзин.
+    """
+    return [
+        int.from_bytes(
+            hashlib.blake2b(_BAND.pack(band, *sig[band * ROWS:(band + 1) * ROWS]), digest_size=8).digest(),
+            'little', signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+def similarity(sig_a, sig_b):
+    """
+    Оценка коэффициента Жаккара по доле совпавших позиций сигнатур.
+    """
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
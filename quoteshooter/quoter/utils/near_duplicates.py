@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import transaction
+
+from core.logger import logger
+
+from ..models import Quote, QuoteBand, QuoteSignature
+from . import minhash
+
+DEFAULT_THRESHOLD = 0.8
+BATCH_SIZE = 2000
+
+def near_dup_threshold():
+    """
+    Порог сходства (0-1) из настройки QUOTER_NEAR_DUP_THRESHOLD.
+    """
+    return getattr(settings, 'QUOTER_NEAR_DUP_THRESHOLD', DEFAULT_THRESHOLD)
+
+def _index_rows(quote_id, sig):
+    return (
+        QuoteSignature(quote_id=quote_id, data=minhash.pack(sig)),
+        [QuoteBand(quote_id=quote_id, bucket=bucket) for bucket in minhash.buckets(sig)],
+    )
+
+@transaction.atomic
+def index_quote(quote):
+    """
+    Пересчитывает MinHash-сигнатуру и LSH-корзины одной цитаты.
+
+    Текст без n-грамм (одна пунктуация) в индекс не попадает.
+
+    Args:
+        quote (Quote): сохранённая цитата.
+    """
+    QuoteBand.objects.filter(quote_id=quote.pk).delete()
+    sig = minhash.signature(quote.text)
+    if sig is None:
+        QuoteSignature.objects.filter(quote_id=quote.pk).delete()
+        return
+    signature, bands = _index_rows(quote.pk, sig)
+    QuoteSignature.objects.update_or_create(quote_id=quote.pk, defaults={'data': signature.data})
+    QuoteBand.objects.bulk_create(bands)
+
+def find_near_duplicates(text, threshold=None, exclude_id=None, source=None):
+    """
+    Ищет цитаты, похожие на text, за сублинейное время.
+
+    Кандидаты берутся из индекса по совпадению хотя бы одной LSH-корзины
+    (один индексный запрос), затем сходство проверяется по сигнатурам
+    кандидатов.
+
+    Args:
+        text (str): текст новой цитаты.
+        threshold (float | None): порог сходства, по умолчанию из настроек.
+        exclude_id (int | None): id цитаты, которую не считать дубликатом.
+        source (str | None): искать только среди цитат этого источника
+            (без учёта регистра); None — среди всех цитат.
+
+    Returns:
+        list[tuple[int, float]]: (id цитаты, сходство) по убыванию сходства.
+    """
+    if threshold is None:
+        threshold = near_dup_threshold()
+
+    sig = minhash.signature(text)
+    if sig is None:
+        return []
+    candidates = QuoteSignature.objects.filter(
+        quote__bands__bucket__in=minhash.buckets(sig)
+    ).distinct().values_list('quote_id', 'data')
+    if source is not None:
+        candidates = candidates.filter(quote__source__data__iexact=source)
+    if exclude_id is not None:
+        candidates = candidates.exclude(quote_id=exclude_id)
+
+    found = []
+    for quote_id, data in candidates:
+        score = minhash.similarity(sig, minhash.unpack(data))
+        if score >= threshold:
+            found.append((quote_id, score))
+    found.sort(key=lambda item: item[1], reverse=True)
+    return found
+
+def rebuild_index(batch_size=BATCH_SIZE):
+    """
+    Строит индекс для всех цитат за один проход.
+
+    Returns:
+        int: количество проиндексированных цитат.
+    """
+    total = 0
+    with transaction.atomic():
+        QuoteBand.objects.all().delete()
+        QuoteSignature.objects.all().delete()
+
+        signatures, bands = [], []
+        for quote_id, text in Quote.objects.values_list('id', 'text').iterator(chunk_size=batch_size):
+            sig = minhash.signature(text)
+            if sig is None:
+                continue
+            signature, quote_bands = _index_rows(quote_id, sig)
+            signatures.append(signature)
+            bands.extend(quote_bands)
+            if len(signatures) >= batch_size:
+                total += _flush(signatures, bands)
+        total += _flush(signatures, bands)
+
+    logger.info(f'Построен MinHash-индекс: {total} цитат')
+    return total
+
+def _flush(signatures, bands):
+    QuoteSignature.objects.bulk_create(signatures)
+    QuoteBand.objects.bulk_create(bands)
+    count = len(signatures)
+    signatures.clear()
+    bands.clear()
+    return count
@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from core.logger import logger
+
+EXACT_COUNT_BELOW = 10_000 # небольшие таблицы считаются точно
+COUNT_CACHE_TIMEOUT = 60 # сек
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админки, не выполняющий COUNT(*) по всей таблице на каждой странице.
+
+    Для выборки без фильтров количество строк берётся:
+        - PostgreSQL: из статистики планировщика (pg_class.reltuples);
+        - остальные БД (SQLite): точный COUNT(*), закэшированный на COUNT_CACHE_TIMEOUT.
+    Отфильтрованные выборки (поиск, фильтры) считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if getattr(qs, 'query', None) is None or qs.query.where:
+            return self._exact_count()
+
+        connection = connections[qs.db]
+        table = qs.model._meta.db_table
+        if connection.vendor == 'postgresql':
+            estimate = self._planner_estimate(connection, table)
+            if estimate is not None and estimate >= EXACT_COUNT_BELOW:
+                return estimate
+            return self._exact_count()
+
+        return cache.get_or_set(f'admin_count:{qs.db}:{table}', self._exact_count, COUNT_CACHE_TIMEOUT)
+
+    def _exact_count(self):
+        return Paginator.count.func(self)
+
+    @staticmethod
+    def _planner_estimate(connection, table):
+        """
+        Оценка числа строк из статистики PostgreSQL.
+
+        Returns:
+            int | None: оценка или None, если таблица ещё не анализировалась.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+        if row is None or row[0] < 0:
+            logger.info(f'Нет статистики планировщика для {table}, точный подсчёт')
+            return None
+        return row[0]
@@ -0,0 +1,137 @@
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import F
+
+from core.logger import logger
+
+from .live_counters import broker
+from .sampler import current_snapshot
+
+DEFAULT_CACHE_SIZE = 1024
+# Живые счётчики подставляются в заранее закодированный ответ при каждом запросе
+COUNTERS_TAIL = b'"views_cnt": %d, "likes": %d, "dislikes": %d}}'
+
+class PayloadRecord:
+    """
+    Предкодированная статическая часть JSON-ответа api_random_quote.
+
+    Args:
+        head (bytes): '{"quote": {"id": ..., "text": ..., "source": ..., "weight": ..., '
+    """
+    __slots__ = ('head',)
+
+    def __init__(self, quote_id, text, source, weight):
+        static = json.dumps({
+            'id': quote_id,
+            'text': text,
+            'source': source,
+            'weight': float(weight),
+        })
+        self.head = b'{"quote": ' + static[:-1].encode() + b', '
+
+    def render(self, views_cnt, likes, dislikes):
+        """
+        Собирает полный JSON-ответ с текущими счётчиками.
+
+        Returns:
+            bytes: тело ответа.
+        """
+        return self.head + COUNTERS_TAIL % (views_cnt, likes, dislikes)
+
+class PayloadCache:
+    """
+    Ограниченный LRU-кэш предкодированных ответов по id цитаты.
+
+    Кэш локален для процесса. Записи привязаны к поколению снимка весов:
+    изменение цитаты или источника сбрасывает записи этого воркера сразу,
+    а остальных — при публикации сборщиком нового поколения (см. signals.py).
+
+    Args:
+        maxsize (int): максимальное количество записей.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.generation = None
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, quote_id, generation=None):
+        with self._lock:
+            if generation != self.generation:
+                self._records.clear()
+                self.generation = generation
+                return None
+            record = self._records.get(quote_id)
+            if record is not None:
+                self._records.move_to_end(quote_id)
+            return record
+
+    def put(self, quote_id, record):
+        with self._lock:
+            self._records[quote_id] = record
+            self._records.move_to_end(quote_id)
+            while len(self._records) > self.maxsize:
+                self._records.popitem(last=False)
+
+    def invalidate(self, quote_id):
+        with self._lock:
+            self._records.pop(quote_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+payload_cache = PayloadCache(getattr(settings, 'QUOTER_PAYLOAD_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+
+def random_quote_payload():
+    """
+    Выбирает случайную цитату по снимку весов и собирает JSON-ответ
+    без создания ORM-объектов.
+
+    При попадании в кэш выполняются два запроса: чтение живых счётчиков
+    и атомарное увеличение просмотров. При промахе счётчики читаются
+    вместе с текстом и источником одним запросом с JOIN.
+
+    Returns:
+        tuple[int, bytes] | None: (id цитаты, тело ответа) или None,
+        если снимок недоступен или выбранной цитаты уже нет.
+    """
+    from ..models import Quote
+
+    snap = current_snapshot()
+    if snap is None:
+        return None
+    quote_id = snap.sample()
+    if quote_id is None:
+        return None
+
+    qs = Quote.objects.filter(pk=quote_id)
+    record = payload_cache.get(quote_id, snap.generation)
+    if record is not None:
+        counters = qs.values_list('views_cnt', 'likes', 'dislikes').first()
+    else:
+        row = qs.values_list(
+            'text', 'source__data', 'weight', 'views_cnt', 'likes', 'dislikes'
+        ).first()
+        if row is None:
+            logger.info(f'Цитата {quote_id} из снимка не найдена в БД.')
+            return None
+        text, source, weight, *counters = row
+        record = PayloadRecord(quote_id, text, source, weight)
+        payload_cache.put(quote_id, record)
+
+    if counters is None:
+        payload_cache.invalidate(quote_id)
+        return None
+
+    qs.update(views_cnt=F('views_cnt') + 1)
+    views_cnt, likes, dislikes = counters
+    broker.publish(quote_id, views_cnt + 1, likes, dislikes)
+    return quote_id, record.render(views_cnt, likes, dislikes)
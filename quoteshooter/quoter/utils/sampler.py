@@ -0,0 +1,225 @@
+import bisect
+import fcntl
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+from array import array
+
+from django.conf import settings
+
+from core.logger import logger
+
+# Формат снимка (нативный порядок байт, файл читается на той же машине):
+#   заголовок: magic, generation, count, total_weight
+#   ids:   int64   * count  — id цитат по возрастанию
+#   cumul: float64 * count  — накопленные веса тех же цитат
+MAGIC = b'QSAMPLR1'
+HEADER = struct.Struct('=8sQQd')
+ITEM_SIZE = 8
+# Рядом со снимком лежат:
+#   <path>.stale — отметка об изменении весов (mtime), её проверяет build_sampler --watch;
+#   <path>.lock  — блокировка единственного публикующего.
+STALE_SUFFIX = '.stale'
+LOCK_SUFFIX = '.lock'
+DEFAULT_MAX_LAG = 30.0 # сек: насколько снимок может отставать от отметки .stale
+
+def snapshot_path():
+    """
+    Путь к файлу снимка из настройки QUOTER_SAMPLER_PATH.
+    Если настройка пуста, снимок не используется.
+    """
+    path = getattr(settings, 'QUOTER_SAMPLER_PATH', None)
+    return os.fspath(path) if path else None
+
+class Snapshot:
+    """
+    Отображённый в память (mmap) снимок весов цитат.
+
+    Массивы ids и cumul — memoryview поверх mmap, без копирования:
+    все воркеры, открывшие один и тот же файл, делят одни страницы памяти.
+
+    Args:
+        key (tuple): (путь, inode, mtime, size) файла, по которому отображён снимок.
+        generation (int): номер поколения снимка.
+        count (int): количество цитат в снимке.
+        total (float): суммарный вес.
+    """
+    __slots__ = ('key', 'generation', 'count', 'total', 'ids', 'cumul', '_mm')
+
+    def __init__(self, path, key):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.generation, self.count, self.total = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'Неизвестный формат снимка: {path}')
+
+        buf = memoryview(self._mm)
+        ids_end = HEADER.size + self.count * ITEM_SIZE
+        self.ids = buf[HEADER.size:ids_end].cast('q')
+        self.cumul = buf[ids_end:ids_end + self.count * ITEM_SIZE].cast('d')
+        self.key = key
+
+    def sample(self):
+        """
+        Выбирает id цитаты с учётом веса бинарным поиском по cumul.
+
+        Returns:
+            int | None: id цитаты или None, если снимок пуст.
+        """
+        if not self.count or self.total <= 0.0:
+            return None
+        point = random.uniform(0.0, self.total)
+        i = bisect.bisect_left(self.cumul, point)
+        return self.ids[min(i, self.count - 1)]
+
+_current = None
+_lock = threading.Lock()
+
+def current_snapshot():
+    """
+    Возвращает актуальный снимок процесса.
+
+    Новое поколение публикуется атомарной заменой файла (os.replace),
+    поэтому смена inode/mtime означает, что пора переотобразить файл.
+    Старое отображение остаётся валидным, пока на него есть ссылки.
+
+    Returns:
+        Snapshot | None: снимок или None, если файла нет или он повреждён.
+    """
+    global _current
+
+    path = snapshot_path()
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    # если сборщик давно не обновлял снимок, веса в нём могут быть неверны:
+    # лучше выбрать цитату по БД, чем по устаревшим данным
+    stale_ns = _stale_mtime_ns(path)
+    max_lag = getattr(settings, 'QUOTER_SAMPLER_MAX_LAG', DEFAULT_MAX_LAG)
+    if stale_ns is not None and stale_ns - st.st_mtime_ns > max_lag * 1e9:
+        return None
+
+    key = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    snap = _current
+    if snap is not None and snap.key == key:
+        return snap
+
+    with _lock:
+        if _current is None or _current.key != key:
+            try:
+                _current = Snapshot(path, key)
+            except (OSError, ValueError, struct.error) as e:
+                logger.error(f'Не удалось отобразить снимок весов {path}: {e}')
+                return None
+            logger.info(f'Загружен снимок весов поколения {_current.generation}: {_current.count} цитат')
+        return _current
+
+def sample_quote_id():
+    """
+    Случайный id цитаты по снимку весов.
+
+    Returns:
+        int | None: id цитаты или None, если снимок недоступен или пуст.
+    """
+    snap = current_snapshot()
+    return snap.sample() if snap is not None else None
+
+def _stale_mtime_ns(path):
+    try:
+        return os.stat(path + STALE_SUFFIX).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def mark_stale():
+    """
+    Отмечает снимок устаревшим (обновляет mtime файла <path>.stale).
+
+    Дёшево и не читает БД, поэтому вызывается из веб-воркеров при каждом
+    изменении весов; сам снимок перестраивает только build_sampler --watch.
+    """
+    path = snapshot_path()
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + STALE_SUFFIX, 'a'):
+        pass
+    os.utime(path + STALE_SUFFIX)
+
+def is_stale(since_ns):
+    """
+    Менялись ли веса с момента since_ns (time.time_ns() начала последней сборки).
+    """
+    path = snapshot_path()
+    if not path:
+        return False
+    stale_ns = _stale_mtime_ns(path)
+    return stale_ns is not None and stale_ns >= since_ns
+
+def _read_generation(path):
+    """
+    Поколение снимка, лежащего на диске (0, если файла нет или он повреждён).
+    """
+    try:
+        with open(path, 'rb') as f:
+            magic, generation, _, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return 0
+    return generation if magic == MAGIC else 0
+
+def publish_snapshot():
+    """
+    Строит снимок весов по БД и атомарно публикует новое поколение.
+
+    Сборка идёт под эксклюзивной блокировкой <path>.lock, а номер поколения
+    берётся из файла на диске, поэтому даже при нескольких сборщиках
+    поколения строго возрастают в порядке чтения БД. Файл пишется во
+    временный файл рядом с целевым и подменяется через os.replace, поэтому
+    читатели никогда не видят частичную запись.
+
+    Returns:
+        int | None: номер опубликованного поколения или None, если снимок отключён.
+    """
+    from ..models import Quote
+
+    path = snapshot_path()
+    if not path:
+        return None
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    with open(path + LOCK_SUFFIX, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            ids, cumul = array('q'), array('d')
+            total = 0.0
+            rows = Quote.objects.filter(weight__gt=0.0).order_by('id').values_list('id', 'weight')
+            for quote_id, weight in rows.iterator():
+                total += weight
+                ids.append(quote_id)
+                cumul.append(total)
+
+            generation = _read_generation(path) + 1
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix='.sampler-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(HEADER.pack(MAGIC, generation, len(ids), total))
+                    ids.tofile(f)
+                    cumul.tofile(f)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    logger.info(f'Опубликован снимок весов поколения {generation}: {len(ids)} цитат')
+    return generation
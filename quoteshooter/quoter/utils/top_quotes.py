@@ -0,0 +1,139 @@
+import json
+
+from django.db.models import Q
+
+from ..models import Quote
+
+TOP_FIELDS = {
+    'views': 'views_cnt',
+    'likes': 'likes',
+}
+TOP_PAGE_SIZE_MAX = 100 # верхняя граница размера страницы топа
+CURSOR_SEP = '_'
+
+def top_field(by):
+    """
+    Возвращает поле сортировки топа по его типу.
+
+    Args:
+        by (str): 'views' или 'likes'.
+
+    Returns:
+        str: имя поля модели Quote.
+    """
+    return TOP_FIELDS.get(by, TOP_FIELDS['views'])
+
+def clamp_page_size(size):
+    """
+    Ограничивает размер страницы диапазоном [1, TOP_PAGE_SIZE_MAX].
+    """
+    return max(1, min(int(size), TOP_PAGE_SIZE_MAX))
+
+def make_cursor(value, quote_id):
+    """
+    Формирует курсор вида '<значение поля>_<id>' для последней строки страницы.
+    """
+    return f'{value}{CURSOR_SEP}{quote_id}'
+
+def parse_cursor(cursor):
+    """
+    Разбирает курсор, сформированный make_cursor.
+
+    Args:
+        cursor (str | None): строка курсора из GET-параметра.
+
+    Returns:
+        tuple[int, int] | None: (значение поля, id) или None для первой страницы.
+
+    Raises:
+        ValueError: если курсор некорректен.
+    """
+    if not cursor:
+        return None
+    # int() допускает '_' внутри числа, поэтому части проверяются явно
+    parts = cursor.split(CURSOR_SEP)
+    if len(parts) != 2 or not all(part.isascii() and part.isdigit() for part in parts):
+        raise ValueError(f'Некорректный курсор: {cursor}')
+    value, quote_id = parts
+    return int(value), int(quote_id)
+
+def top_queryset(by, cursor=None):
+    """
+    Keyset-выборка топа цитат по (поле, id) в порядке убывания.
+
+    Вместо OFFSET используется условие "строго после курсора", поэтому
+    любая страница обходится по индексу так же дёшево, как первая
+    (см. индексы quote_views_id_idx / quote_likes_id_idx). Избыточное
+    условие <поле> <= значение ограничивает диапазон индекса: без него
+    OR-условие не даёт БД начать поиск с курсора (SCAN вместо SEARCH).
+
+    Args:
+        by (str): 'views' или 'likes'.
+        cursor (tuple[int, int] | None): результат parse_cursor.
+
+    Returns:
+        QuerySet[Quote]: неограниченная отсортированная выборка.
+    """
+    field = top_field(by)
+    qs = Quote.objects.order_by(f'-{field}', '-id')
+    if cursor is not None:
+        value, quote_id = cursor
+        qs = qs.filter(
+            Q(**{f'{field}__lte': value}),
+            Q(**{f'{field}__lt': value}) |
+            Q(**{field: value, 'id__lt': quote_id})
+        )
+    return qs
+
+def top_page(by, size, cursor=None):
+    """
+    Возвращает одну страницу топа и курсор следующей страницы.
+
+    Запрашивается size + 1 строк: лишняя строка лишь показывает,
+    что следующая страница существует.
+
+    Returns:
+        tuple[list[Quote], str | None]: цитаты страницы и курсор следующей.
+    """
+    field = top_field(by)
+    rows = list(top_queryset(by, cursor).select_related('source')[:size + 1])
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    last = rows[-1]
+    return rows, make_cursor(getattr(last, field), last.id)
+
+def iter_top_json(by, size, cursor=None):
+    """
+    Потоково отдаёт страницу топа в виде JSON по частям.
+
+    Строки читаются через iterator() без построения списка моделей,
+    источник подтягивается JOIN'ом (source__data), а курсор следующей
+    страницы дописывается в конце документа.
+
+    Yields:
+        str: фрагменты документа {"quotes": [...], "next_cursor": ...}.
+    """
+    field = top_field(by)
+    rows = top_queryset(by, cursor).values_list(
+        'id', 'text', 'source__data', 'views_cnt', 'likes', 'dislikes', 'weight'
+    )[:size + 1]
+
+    yield '{"quotes": ['
+    next_cursor = None
+    last = None
+    for i, (quote_id, text, source, views_cnt, likes, dislikes, weight) in enumerate(rows.iterator()):
+        if i == size:
+            next_cursor = make_cursor(last[field], last['id'])
+            break
+        last = {
+            'id': quote_id,
+            'text': text,
+            'source': source,
+            'views_cnt': views_cnt,
+            'likes': likes,
+            'dislikes': dislikes,
+            'weight': float(weight),
+        }
+        yield (',' if i else '') + json.dumps(last, ensure_ascii=False)
+    yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
@@ -2,6 +2,7 @@ from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 
 from ..models import Quote
+from .live_counters import broker
 
 LIKE_ = "like"
 DISLIKE_ = "dislike"
@@ -48,6 +49,7 @@ def __rate_quote(request, quote_id, action):
 
     quote.save(update_fields=['likes', 'dislikes'])
     quote.refresh_from_db(fields=["likes", "dislikes"])
+    broker.publish(quote.id, quote.views_cnt, quote.likes, quote.dislikes)
     return JsonResponse({"likes": quote.likes, "dislikes": quote.dislikes})
 
 def like_quote(request, quote_id):
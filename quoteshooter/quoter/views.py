@@ -1,13 +1,18 @@
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.views.decorators.http import require_POST
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 
 import json
 
 from .models import Quote
 from .forms import QuoteForm
 from .utils.vote_actions import like_quote, dislike_quote
+from .utils.live_counters import parse_ids, stream_counters
+from .utils.payload_cache import random_quote_payload
+from .utils.top_quotes import clamp_page_size, parse_cursor, top_page, iter_top_json
 
 from core.logger import logger
 
@@ -24,12 +29,24 @@ def index(request):
     if quote:
         quote.increase_views()
         logger.info(f'Отображена цитата на главной: {quote.id}')
-    return render(request, 'quoter/index.html', {'quote': quote})
+    return render(request, 'quoter/index.html', {
+        'quote': quote,
+        'live_counters': settings.QUOTER_SSE_ENABLED
+    })
 
 def api_random_quote(request):
     """
     Возвращает JSON случайной цитаты.
+
+    Основной путь — предкодированный ответ из payload_cache без ORM-объектов;
+    если снимок весов недоступен, цитата выбирается через Quote.weighted_random().
     """
+    cached = random_quote_payload()
+    if cached is not None:
+        quote_id, body = cached
+        logger.info(f'API вернул цитату: {quote_id}')
+        return HttpResponse(body, content_type='application/json')
+
     quote = Quote.weighted_random()
     if quote:
         quote.increase_views()
@@ -50,37 +67,100 @@ def api_random_quote(request):
         logger.info('API вернул пустую цитату.')
     return JsonResponse(data)
 
+async def live_counters(request):
+    """
+    SSE-поток живых счётчиков (просмотры, лайки, дизлайки) для выбранных цитат.
+
+    GET-параметры:
+        ids (str): id цитат через запятую, не больше 100.
+
+    Returns:
+        StreamingHttpResponse: text/event-stream, в каждом событии JSON-массив
+        [{"id", "views_cnt", "likes", "dislikes"}, ...].
+        HttpResponse 204, если поток выключен (QUOTER_SSE_ENABLED) или сервер
+        не ASGI: бесконечный поток под WSGI буферизуется и держит поток воркера,
+        а на 204 EventSource прекращает переподключения.
+    """
+    if not settings.QUOTER_SSE_ENABLED or not isinstance(request, ASGIRequest):
+        logger.info('SSE: поток недоступен (выключен или сервер не ASGI)')
+        return HttpResponse(status=204)
+
+    try:
+        ids = parse_ids(request.GET.get('ids', ''))
+    except ValueError as e:
+        logger.warning(f'SSE: некорректные параметры: {e}')
+        return JsonResponse({'error': 'Некорректный параметр ids.'}, status=400)
+
+    logger.info(f'SSE: подписка на {len(ids)} цитат')
+    response = StreamingHttpResponse(stream_counters(ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 def top_quotes_view(request, num_id, by='views'):
     """
     Отображает топ-N цитат по просмотрам или лайкам.
 
+    Страницы листаются keyset-курсором (GET-параметр cursor),
+    размер страницы ограничен TOP_PAGE_SIZE_MAX.
+
     Args:
         request (HttpRequest)
-        num_id (int): количество цитат
+        num_id (int): количество цитат на странице
         by (str): 'views' или 'likes'
 
     Returns:
         HttpResponse: рендер шаблона 'quoter/top.html'
     """
+    size = clamp_page_size(num_id)
     if by == 'views':
         field = 'views_cnt'
         icon = '🔥'
-        title_text = f'Топ {num_id} цитат по просмотрам'
+        title_text = f'Топ {size} цитат по просмотрам'
     else:
         field = 'likes'
         icon = '❤️'
-        title_text = f'Топ {num_id} цитат по лайкам'
+        title_text = f'Топ {size} цитат по лайкам'
+
+    try:
+        cursor = parse_cursor(request.GET.get('cursor'))
+    except ValueError as e:
+        logger.warning(f'{e}, отображается первая страница')
+        cursor = None
 
-    quotes = Quote.objects.order_by(f'-{field}')[:num_id]
-    logger.info(f'Отображен топ-{num_id} цитат по {field}')
+    quotes, next_cursor = top_page(by, size, cursor)
+    logger.info(f'Отображен топ-{size} цитат по {field}')
 
     return render(request, 'quoter/top.html', {
         'quotes': quotes,
-        'num_id': num_id,
+        'num_id': size,
+        'next_cursor': next_cursor,
         'title_icon': icon,
-        'title_text': title_text
+        'title_text': title_text,
+        'live_counters': settings.QUOTER_SSE_ENABLED
     })
 
+def api_top_quotes(request, by='views'):
+    """
+    Возвращает JSON страницы топа цитат (потоково).
+
+    GET-параметры:
+        limit (int): размер страницы, не больше TOP_PAGE_SIZE_MAX (по умолчанию 10).
+        cursor (str): next_cursor из предыдущего ответа.
+
+    Returns:
+        StreamingHttpResponse: {"quotes": [...], "next_cursor": str | null}.
+    """
+    try:
+        size = clamp_page_size(request.GET.get('limit', 10))
+        cursor = parse_cursor(request.GET.get('cursor'))
+    except ValueError as e:
+        logger.warning(f'API топа: некорректные параметры: {e}')
+        return JsonResponse({'error': 'Некорректные параметры limit/cursor.'}, status=400)
+
+    logger.info(f'API вернул топ-{size} цитат ({by})')
+    return StreamingHttpResponse(iter_top_json(by, size, cursor), content_type='application/json')
+
 def top_10_view(request):
     logger.info('Перенаправление на топ-10 по просмотрам')
     return redirect(reverse('top', args=(10,)), permanent=True)
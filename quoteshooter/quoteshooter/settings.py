@@ -27,6 +27,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.query_inspector.QueryInspectorMiddleware',
 ]
 
 ROOT_URLCONF = 'quoteshooter.urls'
@@ -99,4 +100,39 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-    
\ No newline at end of file
+# снимок весов для Quote.weighted_random, общий для всех воркеров (mmap);
+# пустое значение отключает снимок
+QUOTER_SAMPLER_PATH = os.environ.get('QUOTER_SAMPLER_PATH', BASE_DIR / 'sampler.snapshot')
+# если сборщик (build_sampler --watch) отстал больше чем на столько секунд, снимок не используется
+QUOTER_SAMPLER_MAX_LAG = 30.0
+
+# размер LRU-кэша предкодированных ответов api_random_quote (на процесс)
+QUOTER_PAYLOAD_CACHE_SIZE = 1024
+
+# порог сходства (0-1) MinHash, начиная с которого новая цитата считается почти-дубликатом
+QUOTER_NEAR_DUP_THRESHOLD = 0.8
+
+# живые счётчики по SSE: поток работает только под ASGI-сервером
+# (quoteshooter.asgi:application); под WSGI runserver он занял бы поток навсегда
+QUOTER_SSE_ENABLED = os.environ.get('QUOTER_SSE_ENABLED', '').lower() in ('1', 'true', 'yes')
+# период схлопывания и рассылки живых счётчиков по SSE, сек
+QUOTER_SSE_TICK = 0.5
+
+# бюджеты SQL-запросов по имени URL (см. core/query_inspector.py): число
+# для любого метода или словарь по HTTP-методу;
+# при QUERY_INSPECTOR_STRICT=True превышение бросает исключение
+QUERY_BUDGETS = {
+    'home': 4,
+    'top': 1,
+    'top_likes': 1,
+    'api_random_quote': 4,
+    'api_top': 1,
+    'api_top_likes': 1,
+    # POST: проверки дубликатов и источника, full_clean, вставка и MinHash-индекс
+    'add': {'GET': 2, 'POST': 20},
+    'like_quote': 9,
+    'dislike_quote': 9,
+    'update_weight': 7,
+}
+QUERY_INSPECTOR_STRICT = False
+QUERY_INSPECTOR_REPEAT_THRESHOLD = 3